@@ -11,8 +11,8 @@
 
 # Contact: Ezhilsabareesh Kannadasan <ezhilsabareesh.kannadasan@anu.edu.au>
 
-from xml.etree.ElementTree import Element, SubElement, tostring
-from xml.dom import minidom
+from xml.etree.ElementTree import Element, SubElement, indent, tostring
+import shlex
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -22,92 +22,109 @@ sys.path.append(str(path_root))
 
 from scripts_common import get_provenance_metadata
 
-if len(sys.argv) != 3:
-    print("Usage: python generate_xml_drof.py year_first year_last")
-    sys.exit(1)
-
-try:
-    year_first = int(sys.argv[1])
-    year_last = int(sys.argv[2])
-except ValueError:
-    print("Year values must be integers")
-    sys.exit(1)
-
-year_align = year_first
-
-# Create the root element
-root = Element("file", id="stream", version="2.0")
-
-# Obtain metadata
-this_file = sys.argv[0]
-runcmd = " ".join(sys.argv)
-metadata_info = get_provenance_metadata(this_file, runcmd)
-
-# Add metadata
-metadata = SubElement(root, "metadata")
-SubElement(metadata, "File_type").text = "DROF xml file provides river runoff data"
-SubElement(metadata, "date_generated").text = datetime.now().strftime(
-    "%Y-%m-%d %H:%M:%S"
-)
-SubElement(metadata, "history").text = metadata_info
-
 # Define the stream info names and corresponding var names
-stream_info_data = [
+STREAM_INFO_DATA = [
     ("JRA55do.FRIVER", "friver", "Forr_rofl"),
     ("JRA55do.LICALVF", "licalvf", "Forr_rofi"),
 ]
 
-# Generate stream info elements with changing years
-for stream_name, var_prefix, var_suffix in stream_info_data:
-    stream_info = SubElement(root, "stream_info", name=stream_name)
-    if year_first == year_last:
-        SubElement(stream_info, "taxmode").text = "cycle"
-    else:
-        SubElement(stream_info, "taxmode").text = "limit"
-    SubElement(stream_info, "tintalgo").text = "upper"
-    SubElement(stream_info, "readmode").text = "single"
-    SubElement(stream_info, "mapalgo").text = "bilinear"
-    SubElement(stream_info, "dtlimit").text = "3.0"
-    SubElement(stream_info, "year_first").text = str(year_first)
-    SubElement(stream_info, "year_last").text = str(year_last)
-    SubElement(stream_info, "year_align").text = str(year_align)
-    SubElement(stream_info, "vectors").text = "null"
-    SubElement(stream_info, "meshfile").text = "./INPUT/JRA55do-drof-ESMFmesh.nc"
-    SubElement(stream_info, "lev_dimname").text = "null"
-
-    datafiles = SubElement(stream_info, "datafiles")
-    datavars = SubElement(stream_info, "datavars")
-
-    if year_first == year_last:
-        SubElement(stream_info, "offset").text = "0"  # RYF starts at midnight
-    else:
-        SubElement(stream_info, "offset").text = (
-            "-43200"  # shift backwards from noon to midnight to match RYF
-        )
-
-    var_element = SubElement(datavars, "var")
-    var_element.text = f"{var_prefix} {var_suffix}"
-
-    for year in range(year_first, year_last + 1):
+# IAF input file templates for each runoff variable, as (template, 2019 template).
+# The 2019 files only cover the first five days of the year.
+IAF_TEMPLATES = {
+    "friver": (
+        "./INPUT/land/day/friver/gr/v20190429/friver_input4MIPs_atmosphericState_OMIP_MRI-JRA55-do-1-4-0_gr_{year}0101-{year}1231.nc",
+        "./INPUT/land/day/friver/gr/v20190429/friver_input4MIPs_atmosphericState_OMIP_MRI-JRA55-do-1-4-0_gr_{year}0101-{year}0105.nc",
+    ),
+    "licalvf": (
+        "./INPUT/landIce/day/licalvf/gr/v20190429/licalvf_input4MIPs_atmosphericState_OMIP_MRI-JRA55-do-1-4-0_gr_{year}0101-{year}1231.nc",
+        "./INPUT/landIce/day/licalvf/gr/v20190429/licalvf_input4MIPs_atmosphericState_OMIP_MRI-JRA55-do-1-4-0_gr_{year}0101-{year}0105.nc",
+    ),
+}
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python generate_xml_drof.py year_first year_last")
+        sys.exit(1)
+
+    try:
+        year_first = int(sys.argv[1])
+        year_last = int(sys.argv[2])
+    except ValueError:
+        print("Year values must be integers")
+        sys.exit(1)
+
+    year_align = year_first
+
+    # Create the root element
+    root = Element("file", id="stream", version="2.0")
+
+    # Obtain metadata
+    this_file = sys.argv[0]
+    runcmd = shlex.join(sys.argv)
+    metadata_info = get_provenance_metadata(this_file, runcmd)
+
+    # Add metadata
+    metadata = SubElement(root, "metadata")
+    SubElement(metadata, "File_type").text = "DROF xml file provides river runoff data"
+    SubElement(metadata, "date_generated").text = datetime.now().strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    SubElement(metadata, "history").text = metadata_info
+
+    # Stream info fields that are the same for every stream, in output order
+    common_fields = (
+        ("taxmode", "cycle" if year_first == year_last else "limit"),
+        ("tintalgo", "upper"),
+        ("readmode", "single"),
+        ("mapalgo", "bilinear"),
+        ("dtlimit", "3.0"),
+        ("year_first", str(year_first)),
+        ("year_last", str(year_last)),
+        ("year_align", str(year_align)),
+        ("vectors", "null"),
+        ("meshfile", "./INPUT/JRA55do-drof-ESMFmesh.nc"),
+        ("lev_dimname", "null"),
+    )
+
+    # Generate stream info elements with changing years
+    for stream_name, var_prefix, var_suffix in STREAM_INFO_DATA:
+        stream_info = SubElement(root, "stream_info", name=stream_name)
+        for tag, text in common_fields:
+            SubElement(stream_info, tag).text = text
+
+        datafiles = SubElement(stream_info, "datafiles")
+        datavars = SubElement(stream_info, "datavars")
+
         if year_first == year_last:
-            file_element = SubElement(datafiles, "file")
-            file_element.text = f"./INPUT/RYF.{var_prefix}.{year+90}_{year + 90 + 1}.nc"
+            SubElement(stream_info, "offset").text = "0"  # RYF starts at midnight
         else:
+            SubElement(stream_info, "offset").text = (
+                "-43200"  # shift backwards from noon to midnight to match RYF
+            )
+
+        var_element = SubElement(datavars, "var")
+        var_element.text = f"{var_prefix} {var_suffix}"
+
+        if year_first == year_last:
             file_element = SubElement(datafiles, "file")
-            if var_prefix == "friver":
-                if year != 2019:
-                    file_element.text = f"./INPUT/land/day/{var_prefix}/gr/v20190429/friver_input4MIPs_atmosphericState_OMIP_MRI-JRA55-do-1-4-0_gr_{year}0101-{year}1231.nc"
-                else:
-                    file_element.text = f"./INPUT/land/day/{var_prefix}/gr/v20190429/friver_input4MIPs_atmosphericState_OMIP_MRI-JRA55-do-1-4-0_gr_{year}0101-{year}0105.nc"
-            else:
-                if year != 2019:
-                    file_element.text = f"./INPUT/landIce/day/{var_prefix}/gr/v20190429/licalvf_input4MIPs_atmosphericState_OMIP_MRI-JRA55-do-1-4-0_gr_{year}0101-{year}1231.nc"
-                else:
-                    file_element.text = f"./INPUT/landIce/day/{var_prefix}/gr/v20190429/licalvf_input4MIPs_atmosphericState_OMIP_MRI-JRA55-do-1-4-0_gr_{year}0101-{year}0105.nc"
-
-# Convert the XML to a nicely formatted string
-xml_str = minidom.parseString(tostring(root)).toprettyxml(indent="  ")
-
-# Write the XML content to a file
-with open("drof.streams.xml", "w") as xml_file:
-    xml_file.write(xml_str)
+            file_element.text = (
+                f"./INPUT/RYF.{var_prefix}.{year_first+90}_{year_first + 90 + 1}.nc"
+            )
+        else:
+            # Select the file templates once per stream rather than once per year
+            template, template_2019 = IAF_TEMPLATES[var_prefix]
+            for year in range(year_first, year_last + 1):
+                file_element = SubElement(datafiles, "file")
+                file_element.text = (
+                    template_2019 if year == 2019 else template
+                ).format(year=year)
+
+    # Indent the XML in place and write it to a file in a single call
+    indent(root, space="  ")
+    with open("drof.streams.xml", "wb") as xml_file:
+        xml_file.write(tostring(root, encoding="utf-8", xml_declaration=True) + b"\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,14 +16,16 @@ License: Apache 2.0 License http://www.apache.org/licenses/LICENSE-2.0.txt
 import os
 import sys
 import re
+import math
 import subprocess
 import shutil
-import glob
+import stat
 import argparse
+import io
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 try:
-    import numpy as np
     import git
     import f90nml
     from ruamel.yaml import YAML
@@ -80,6 +82,17 @@ class Expts_manager(object):
 
     DIR_MANAGER = os.getcwd()
 
+    # coupling timestep in `nuopc.runseq`, e.g., `@1800`
+    CPL_DT_PATTERN = re.compile(r"@(\S+)")
+
+    # tag models for parameter blocks that are identified by their exact filename
+    BLOCK_TAG_MODELS = {
+        "MOM_input": "mom6",
+        "nuopc.runseq": "cpl_dt",
+        "config.yaml": "config",
+        "nuopc.runconfig": "runconfig",
+    }
+
     def __init__(
         self,
         force_overwrite_tools: bool = False,
@@ -103,6 +116,20 @@ class Expts_manager(object):
         self.runseq_prefix = runseq_prefix
         self.branch_perturb = branch_perturb
         self.combo_suffix = combo_suffix
+        self.runconfig_group_suffixes = (
+            runconfig_suffix1,
+            runconfig_suffix2,
+            combo_suffix,
+        )
+
+        # parameter group handlers for each tag model
+        self.group_handlers = {
+            "nml": self._handle_nml_group,
+            "mom6": self._handle_mom6_group,
+            "cpl_dt": self._handle_cpl_dt_group,
+            "config": self._handle_config_group,
+            "runconfig": self._handle_runconfig_group,
+        }
 
     def load_variables(self, yamlfile):
         """
@@ -152,6 +179,7 @@ class Expts_manager(object):
         self.check_duplicate_jobs = self.indata.get("check_duplicate_jobs", True)
         self.check_skipping = self.indata.get("check_skipping", False)
         self.force_restart = self.indata.get("force_restart", False)
+        self.clone_workers = self.indata.get("clone_workers", 1)
         self.startfrom = self.indata["startfrom"]
         self.startfrom_str = str(self.startfrom).strip().lower().zfill(3)
         self.nruns = self.indata.get("nruns", 0)
@@ -167,6 +195,9 @@ class Expts_manager(object):
         commt_dict_change (dict): Specific for MOM_input, dictionary of comments for parameters.
         append_group_list (list): Specific for f90nml, the list containing tunning parameters.
         expt_names list(str): Optional user-defined directory names for perturbation experiments.
+        mom6_commt_dict (dict): Specific for MOM_input, cached comment dictionary of the control experiment `MOM_input`.
+        nml_ctrl_cache (dict): Specific for f90nml, cached namelists of the control experiment, keyed by file name.
+        ctrl_restartpath (str): Cached resolved restart directory of the control experiment used by perturbation experiments.
         tmp_count (int): count the number of parameter groups in a single parameter block in process.
         group_count (int): total number of parameter groups in a single parameter block.
         """
@@ -178,6 +209,9 @@ class Expts_manager(object):
         self.previous_key = None
         self.expt_names = None
         self.diag_path = None
+        self.mom6_commt_dict = None
+        self.nml_ctrl_cache = {}
+        self.ctrl_restartpath = None
 
         self.tmp_count = 0
         self.group_count = None
@@ -190,26 +224,28 @@ class Expts_manager(object):
         # currently import from a fork: https://github.com/minghangli-uni/om3-utils
         # will update the tool when it is merged to COSIMA/om3-utils
         def _clone_repo(branch_name, url, path, tool_name, force_overwrite_tools):
+            command = [
+                "git",
+                "clone",
+                "--branch",
+                branch_name,
+                url,
+                path,
+                "--single-branch",
+            ]
             if os.path.exists(path) and os.path.isdir(path):
-                if force_overwrite_tools:
-                    print(
-                        f"-- Force_overwrite_tools is activated, hence removing existing {tool_name}: {path}"
-                    )
-                    shutil.rmtree(path)
-                    print(f"Cloning {tool_name} for use!")
-                    command = (
-                        f"git clone --branch {branch_name} {url} {path} --single-branch"
-                    )
-                    subprocess.run(command, shell=True, check=True)
-                else:
+                if not force_overwrite_tools:
                     print(f"{tool_name} already exists, hence skips cloning!")
-            else:
-                print(f"Cloning {tool_name} for use!")
-                command = (
-                    f"git clone --branch {branch_name} {url} {path} --single-branch"
+                    return
+                print(
+                    f"-- Force_overwrite_tools is activated, hence removing existing {tool_name}: {path}"
                 )
-                subprocess.run(command, shell=True, check=True)
-            print(f"Finished cloning {tool_name}!")
+                shutil.rmtree(path)
+            print(f"Cloning {tool_name} for use!")
+            # start the clone without waiting, so independent tools are fetched concurrently
+            clones.append((tool_name, command, subprocess.Popen(command)))
+
+        clones = []
 
         # om3-utils is a must for om3 but not required for access-om2.
         utils_path = (
@@ -255,6 +291,14 @@ class Expts_manager(object):
         else:
             sys.path.extend([utils_path])
 
+        # wait for every clone before reporting a failure, so none is left running
+        for tool_name, command, proc in clones:
+            if proc.wait() == 0:
+                print(f"Finished cloning {tool_name}!")
+        for tool_name, command, proc in clones:
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(proc.returncode, command)
+
         if utils_path is not None:
             # load modules from om3-utils
             from om3utils import MOM6InputParser
@@ -321,12 +365,12 @@ class Expts_manager(object):
         # setup the control experiments
         self._setup_ctrl_expt()
 
-        # check existing pbs jobs
-        pbs_jobs = self._output_existing_pbs_jobs()
-
-        # check duplicated running jobs
+        # check duplicated running jobs against existing pbs jobs
         if self.check_duplicate_jobs:
-            duplicated_bool = self._check_duplicated_jobs(pbs_jobs, base_path)
+            active_job_folders = self._get_active_job_folders(
+                self._output_existing_pbs_jobs()
+            )
+            duplicated_bool = self._check_duplicated_jobs(active_job_folders, base_path)
         else:
             duplicated_bool = False
 
@@ -344,8 +388,8 @@ class Expts_manager(object):
         Clones the template repo.
         """
         print(f"Cloning template from {self.base_url} to {self.base_path}")
-        command = f"payu clone {self.base_url} {self.base_path}"
-        subprocess.run(command, shell=True, check=False)
+        command = ["payu", "clone", self.base_url, self.base_path]
+        subprocess.run(command, check=False)
 
     def _extract_config_via_commit(self):
         """
@@ -365,8 +409,7 @@ class Expts_manager(object):
         Copies the diagnostic table (`diag_table`) to the specified path if a path is defined.
         """
         if self.diag_path:
-            command = f"scp {os.path.join(self.diag_path,'diag_table')} {path}"
-            subprocess.run(command, shell=True, check=False)
+            shutil.copy2(os.path.join(self.diag_path, "diag_table"), path)
             print(f"Copy diag_table to {path}")
         else:
             print(
@@ -386,52 +429,40 @@ class Expts_manager(object):
         Updates configuration files (config.yaml, nuopc.runconfig etc),
         namelist and MOM_input for the control experiment if needed.
         """
-        # for file_name in os.listdir(self.base_path):
-        for root, dirs, files in os.walk(self.base_path):
-            dirs[:] = [tmp_d for tmp_d in dirs if ".git" not in tmp_d]
-            for f in files:
-                if ".git" in f:
-                    continue
-                file_name = os.path.relpath(os.path.join(root, f), self.base_path)
-                yaml_data = self.indata.get(file_name, None)
-
-                if yaml_data:
-                    # Update parameters from namelists
-                    if file_name.endswith("_in") or file_name.endswith(".nml"):
-                        self._update_nml_params(self.base_path, yaml_data, file_name)
-
-                    # Update config entries from `nuopc.runconfig`
-                    if file_name == "nuopc.runconfig":
-                        self._update_runconfig_params(
-                            self.base_path, yaml_data, file_name
-                        )
+        # only the files configured in the input YAML need updating, so look those up
+        # directly rather than walking the whole control experiment repo
+        for file_name, yaml_data in self.indata.items():
+            if not yaml_data or ".git" in file_name:
+                continue
+            file_path = os.path.join(self.base_path, file_name)
+            if not os.path.isfile(file_path):
+                continue
 
-                    # Update config entries from `config_yaml`
-                    if file_name == "config.yaml":
-                        self._update_config_params(self.base_path, yaml_data, file_name)
+            # Update parameters from namelists
+            if file_name.endswith("_in") or file_name.endswith(".nml"):
+                self._update_nml_params(self.base_path, yaml_data, file_name)
 
-                    # Update and overwrite parameters from and into `MOM_input`
-                    if file_name == "MOM_input":
-                        # parse existing MOM_input
-                        MOM_inputParser = self._parser_mom6_input(
-                            os.path.join(self.base_path, file_name)
-                        )
-                        param_dict = (
-                            MOM_inputParser.param_dict
-                        )  # read parameter dictionary
-                        commt_dict = (
-                            MOM_inputParser.commt_dict
-                        )  # read comment dictionary
-                        param_dict.update(yaml_data)
-                        # overwrite to the same `MOM_input`
-                        MOM_inputParser.writefile_MOM_input(
-                            os.path.join(self.base_path, file_name)
-                        )
+            # Update config entries from `nuopc.runconfig`
+            if file_name == "nuopc.runconfig":
+                self._update_runconfig_params(self.base_path, yaml_data, file_name)
+
+            # Update config entries from `config_yaml`
+            if file_name == "config.yaml":
+                self._update_config_params(self.base_path, yaml_data, file_name)
+
+            # Update and overwrite parameters from and into `MOM_input`
+            if file_name == "MOM_input":
+                # parse existing MOM_input
+                MOM_inputParser = self._parser_mom6_input(file_path)
+                param_dict = MOM_inputParser.param_dict  # read parameter dictionary
+                commt_dict = MOM_inputParser.commt_dict  # read comment dictionary
+                param_dict.update(yaml_data)
+                # overwrite to the same `MOM_input`
+                MOM_inputParser.writefile_MOM_input(file_path)
 
-                    # Update only coupling timestep from `nuopc.runseq`
-                    if file_name == "nuopc.runseq":
-                        nuopc_runseq_file = os.path.join(self.base_path, file_name)
-                        self._update_cpl_dt_nuopc_seq(nuopc_runseq_file, yaml_data)
+            # Update only coupling timestep from `nuopc.runseq`
+            if file_name == "nuopc.runseq":
+                self._update_cpl_dt_nuopc_seq(file_path, yaml_data)
 
     def _check_and_commit_changes(self):
         """
@@ -440,13 +471,11 @@ class Expts_manager(object):
         """
         repo = git.Repo(self.base_path)
         print(f"Current base branch is: {repo.active_branch.name}")
-        deleted_files = self._get_deleted_files(repo)
+        deleted_files, changed_files, untracked_files = self._get_worktree_status(repo)
         # remove deleted files or `work` directory
         if deleted_files:
             repo.index.remove(deleted_files, r=True)
-        untracked_files = self._get_untracked_files(repo)
-        changed_files = self._get_changed_files(repo)
-        staged_files = set(untracked_files + changed_files)
+        staged_files = {*untracked_files, *changed_files}
         # restore *.swp files in case users open any files during case is are running
         self._restore_swp_files(repo, staged_files)
         commit_message = f"Control experiment setup: Configure `{self.base_branch_name}` branch by `{self.yamlfile}`\n committed files/directories {staged_files}!"
@@ -516,14 +545,8 @@ class Expts_manager(object):
         # e.g., input.nml, ice_in etc.
         if k.endswith(("_in", ".nml")):
             tag_model = "nml"
-        elif k == "MOM_input":
-            tag_model = "mom6"
-        elif k == "nuopc.runseq":
-            tag_model = "cpl_dt"
-        elif k == "config.yaml":
-            tag_model = "config"
-        elif k == "nuopc.runconfig":
-            tag_model = "runconfig"
+        elif k in self.BLOCK_TAG_MODELS:
+            tag_model = self.BLOCK_TAG_MODELS[k]
         elif k.startswith("cross_block"):
             tag_model = "cb"
         else:
@@ -537,16 +560,14 @@ class Expts_manager(object):
         """
         Counts the number of groups
         """
-        group_count = 0
-        for key, value in tmp_dict.items():
+        return sum(
+            1
+            for key, value in tmp_dict.items()
             # skip the user-defined expt directory name
-            if key == expt_dir_name:
-                continue
-            if isinstance(value, dict):
-                for inner_key, inner_value in value.items():
-                    if isinstance(inner_value, dict):
-                        group_count += 1
-        return group_count
+            if key != expt_dir_name and isinstance(value, dict)
+            for inner_value in value.values()
+            if isinstance(inner_value, dict)
+        )
 
     def _process_params_blocks_cross_files(self, k, namelists):
         """
@@ -587,10 +608,7 @@ class Expts_manager(object):
             name_dict = tmp_nmls[k_sub]
             if k_sub.endswith(self.combo_suffix):
                 if tmp_k.startswith("MOM_input"):
-                    MOM_inputParser = self._parser_mom6_input(
-                        os.path.join(self.base_path, "MOM_input")
-                    )
-                    commt_dict = MOM_inputParser.commt_dict
+                    commt_dict = self._get_mom6_commt_dict()
                 else:
                     commt_dict = None
                 if name_dict is not None:
@@ -612,6 +630,29 @@ class Expts_manager(object):
         mom6parser.parse_lines()
         return mom6parser
 
+    def _get_mom6_commt_dict(self):
+        """
+        Returns the comment dictionary of the control experiment `MOM_input`.
+        The control `MOM_input` is not modified by perturbation experiments, hence it is parsed only once.
+        """
+        if self.mom6_commt_dict is None:
+            MOM_inputParser = self._parser_mom6_input(
+                os.path.join(self.base_path, "MOM_input")
+            )
+            self.mom6_commt_dict = MOM_inputParser.commt_dict
+        return self.mom6_commt_dict
+
+    def _get_nml_ctrl(self, parameter_block):
+        """
+        Returns the namelist `parameter_block` of the control experiment.
+        The control namelists are not modified by perturbation experiments, hence each is parsed only once.
+        """
+        if parameter_block not in self.nml_ctrl_cache:
+            self.nml_ctrl_cache[parameter_block] = f90nml.read(
+                os.path.join(self.base_path, parameter_block)
+            )
+        return self.nml_ctrl_cache[parameter_block]
+
     def _process_params_group(self, k, k_sub, nmls, expt_dir_name, tag_model):
         """
         Processes individual parameter groups based on the tag model.
@@ -623,16 +664,7 @@ class Expts_manager(object):
             expt_dir_name (str, optional): The key in the YAML file specifies a list of user-defined directory names related to parameter testing.
             tag_model (str): The tag model indicating the type of parameter block.
         """
-        if tag_model == "nml":
-            self._handle_nml_group(k, k_sub, expt_dir_name, nmls)
-        elif tag_model == "mom6":
-            self._handle_mom6_group(k, k_sub, expt_dir_name, nmls)
-        elif tag_model == "cpl_dt":
-            self._handle_cpl_dt_group(k, k_sub, expt_dir_name, nmls)
-        elif tag_model == "config":
-            self._handle_config_group(k, k_sub, expt_dir_name, nmls)
-        elif tag_model == "runconfig":
-            self._handle_runconfig_group(k, k_sub, expt_dir_name, nmls)
+        self.group_handlers[tag_model](k, k_sub, expt_dir_name, nmls)
         self.previous_key = k_sub
 
     def _handle_config_group(self, k, k_sub, expt_dir_name, nmls):
@@ -653,11 +685,7 @@ class Expts_manager(object):
         """
         Handles config.yaml and nuopc.runconfig parameter groups specific to `config` tag model.
         """
-        if (
-            not k_sub.endswith(self.runconfig_suffix1)
-            or k_sub.endswith(self.runconfig_suffix2)
-            or k_sub.endswith(self.combo_suffix)
-        ):
+        if k_sub.endswith(self.runconfig_group_suffixes):
             self._process_parameter_group_common(k, k_sub, nmls, expt_dir_name)
         elif k_sub.startswith(expt_dir_name):
             pass
@@ -672,7 +700,7 @@ class Expts_manager(object):
         """
         Handles namelist parameter groups specific to `nml` tag model.
         """
-        if k_sub.endswith(self.nml_suffix) or k_sub.endswith(self.combo_suffix):
+        if k_sub.endswith((self.nml_suffix, self.combo_suffix)):
             self._process_parameter_group_common(k, k_sub, nmls, expt_dir_name)
         elif k_sub.startswith(expt_dir_name):
             pass
@@ -688,10 +716,7 @@ class Expts_manager(object):
         Handles namelist parameter groups specific to `mom6` tag model.
         """
         if k_sub.startswith(self.MOM_prefix):
-            MOM_inputParser = self._parser_mom6_input(
-                os.path.join(self.base_path, "MOM_input")
-            )
-            commt_dict = MOM_inputParser.commt_dict
+            commt_dict = self._get_mom6_commt_dict()
             self._process_parameter_group_common(
                 k,
                 k_sub,
@@ -777,38 +802,24 @@ class Expts_manager(object):
         """
         Each dictionary has a single key-value pair.
         """
-        param_dict_change_list = []
-        append_group_list = []
-        for k, vs in name_dict.items():
-            if isinstance(vs, list):
-                for v in vs:
-                    param_dict_change = {k: v}
-                    param_dict_change_list.append(param_dict_change)
-                    append_group = k_sub
-                    append_group_list.append(append_group)
-            else:
-                param_dict_change = {k: vs}
-                param_dict_change_list.append(param_dict_change)
-                append_group_list = [k_sub]
-        self.param_dict_change_list = param_dict_change_list
+        self.param_dict_change_list = [
+            {k: v}
+            for k, vs in name_dict.items()
+            for v in (vs if isinstance(vs, list) else [vs])
+        ]
         if self.tag_model == "mom6":
             self.commt_dict_change = {k: commt_dict.get(k, "") for k in name_dict}
         elif self.tag_model in (("nml", "config", "runconfig")):
-            self.append_group_list = append_group_list
+            self.append_group_list = [k_sub] * len(self.param_dict_change_list)
 
     def _generate_combined_dicts(self, name_dict, commt_dict, k_sub, parameter_block):
         """
         Generates a list of dictionaries where each dictionary contains all keys with values from the same index.
         """
-        param_dict_change_list = []
-        append_group_list = []
-        for i in range(self.num_expts):
-            name_dict = self._preprocess_nested_dicts(name_dict)
-            param_dict_change = {k: name_dict[k][i] for k in name_dict}
-            append_group = k_sub
-            append_group_list.append(append_group)
-            param_dict_change_list.append(param_dict_change)
-        self.param_dict_change_list = param_dict_change_list
+        name_dict = self._preprocess_nested_dicts(name_dict)
+        self.param_dict_change_list = [
+            {k: name_dict[k][i] for k in name_dict} for i in range(self.num_expts)
+        ]
 
         if self.tag_model == "mom6" or parameter_block == "MOM_input":
             self.commt_dict_change = {k: commt_dict.get(k, "") for k in name_dict}
@@ -817,7 +828,7 @@ class Expts_manager(object):
             or parameter_block.endswith(("_in", ".nml"))
             or parameter_block in (("config.yaml", "nuopc.runconfig", "nuopc.runseq"))
         ):
-            self.append_group_list = append_group_list
+            self.append_group_list = [k_sub] * self.num_expts
 
     def _preprocess_nested_dicts(self, input_data):
         """
@@ -846,21 +857,28 @@ class Expts_manager(object):
         """
         Sets up perturbation experiments based on the YAML input file provided in `Expts_manager.yaml`.
         """
+        test_root = os.path.join(self.dir_manager, self.test_path)
+        # config.yaml parameter updates also force `jobname`, so config.yaml is read and written only once
+        update_config = self.tag_model == "config" or parameter_block == "config.yaml"
+
+        # clone all missing perturbation experiments up front
+        new_expt_paths = self._generate_expt_directories(
+            parameter_block, test_root, self.clone_workers
+        )
+
+        # folders of existing pbs jobs, queried once per parameter group
+        active_job_folders = None
         for i, param_dict in enumerate(self.param_dict_change_list):
             print(f"-- tunning parameters: {param_dict}")
             # generate perturbation experiment directory names
             expt_name = self._generate_expt_names(i)
 
             # perturbation experiment path
-            expt_path = os.path.join(self.dir_manager, self.test_path, expt_name)
+            expt_path = os.path.join(test_root, expt_name)
 
-            # generate perturbation experiment directory
-            if os.path.exists(expt_path):
+            if expt_path not in new_expt_paths and os.path.exists(expt_path):
                 if self.tmp_count == self.group_count or self.tag_model != "cb":
                     print(f"-- not creating {expt_path} - already exists!")
-            else:
-                if self.tmp_count == 1 or self.tag_model != "cb":
-                    self._generate_expt_directory(expt_path, parameter_block, i)
 
             if self.tmp_count == self.group_count or self.tag_model != "cb":
                 # optionally update diag_table for perturbation runs
@@ -872,7 +890,8 @@ class Expts_manager(object):
                 self._update_metadata_yaml_perturb(expt_path, param_dict, restartpath)
 
                 # update jobname same as perturbation experiment name
-                self._update_perturb_jobname(expt_path, expt_name)
+                if not update_config:
+                    self._update_perturb_jobname(expt_path, expt_name)
 
                 # optionally update nuopc.runconfig for perturbation runs
                 # if there is no parameter tunning under cb or runconfig flags!
@@ -890,22 +909,31 @@ class Expts_manager(object):
                 self._update_nml_params(expt_path, param_dict, parameter_block, i)
             elif self.tag_model == "cpl_dt" or parameter_block == "nuopc.runseq":
                 self._update_cpl_dt_params(expt_path, param_dict, parameter_block)
-            elif self.tag_model == "config" or parameter_block == "config.yaml":
+            elif update_config:
                 self._update_config_params(expt_path, param_dict, parameter_block)
             elif self.tag_model == "runconfig" or parameter_block == "nuopc.runconfig":
                 self._update_runconfig_params(expt_path, param_dict, parameter_block, i)
 
             if self.tmp_count == self.group_count or self.tag_model != "cb":
-                pbs_jobs = self._output_existing_pbs_jobs()
                 if self.check_duplicate_jobs:
-                    duplicated_bool = self._check_duplicated_jobs(pbs_jobs, expt_path)
+                    if active_job_folders is None:
+                        active_job_folders = self._get_active_job_folders(
+                            self._output_existing_pbs_jobs()
+                        )
+                    duplicated_bool = self._check_duplicated_jobs(
+                        active_job_folders, expt_path
+                    )
                 else:
                     duplicated_bool = False
 
                 # start runs, count existing runs and do additional runs if needed
-                self._start_experiment_runs(
+                submitted = self._start_experiment_runs(
                     expt_path, expt_name, duplicated_bool, self.nruns
                 )
+                # the cached job folders predate this submission, so record it
+                # to catch a repeated `expt_path` later in this parameter group
+                if submitted and active_job_folders is not None:
+                    active_job_folders.add(expt_path)
 
         if self.tag_model != "cb":
             # reset to None after the loop to update user-defined perturbation experiment names!
@@ -920,15 +948,52 @@ class Expts_manager(object):
         # user-defined directory names for each parameter-tunning experiment.
         return self.expt_names[indx]
 
-    def _generate_expt_directory(self, expt_path, parameter_block, indx):
+    def _generate_expt_directories(self, parameter_block, test_root, max_workers):
+        """
+        Generates all missing perturbation experiment directories of the current parameter group.
+        The `payu clone`s are independent of each other, hence they can run concurrently,
+        while the skipping checks and messages stay in order on the main thread.
+
+        Args:
+            parameter_block (str): The name of the parameter block in process.
+            test_root (str): The directory holding the perturbation experiments.
+            max_workers (int): The maximum number of concurrent clones, i.e., `clone_workers`.
+        Returns:
+            set: Paths of the newly generated experiment directories.
+        """
+        if self.tmp_count != 1 and self.tag_model == "cb":
+            return set()
+
+        new_expts = {}
+        for i in range(len(self.param_dict_change_list)):
+            expt_path = os.path.join(test_root, self._generate_expt_names(i))
+            if expt_path not in new_expts and not os.path.exists(expt_path):
+                new_expts[expt_path] = i
+
+        for expt_path, i in new_expts.items():
+            self._check_expt_skipping(expt_path, parameter_block, i)
+            print(f"Directory {expt_path} not exists, hence cloning template!")
+
+        if new_expts:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(self._generate_expt_directory, expt_path)
+                    for expt_path in new_expts
+                ]
+                for future in futures:
+                    future.result()  # re-raise any failed clone
+
+        return set(new_expts)
+
+    def _check_expt_skipping(self, expt_path, parameter_block, indx):
         """
-        Generates a new experiment directory by cloning the control experiment.
         Checks if the tuning parameter matches the control experiment,
         this validation currently applies only to `nml` files.
 
         Args:
             expt_path (str): The path to the experiment directory.
-            param_dict (dict): The dictionary of parameters to update.
+            parameter_block (str): The name of the parameter block in process.
+            indx (int): The index of the perturbation experiment.
         """
         if self.check_skipping:
             if self.tag_model == "nml":
@@ -943,9 +1008,25 @@ class Expts_manager(object):
             elif self.tag_model == "cpl_dt":  # TODO
                 pass
 
-        print(f"Directory {expt_path} not exists, hence cloning template!")
-        command = f"payu clone -B {self.base_branch_name} -b {self.branch_perturb} {self.base_path} {expt_path}"  # automatically leave a commit with expt uuid
-        subprocess.run(command, shell=True, check=True)
+    def _generate_expt_directory(self, expt_path):
+        """
+        Generates a new experiment directory by cloning the control experiment.
+
+        Args:
+            expt_path (str): The path to the experiment directory.
+        """
+        # automatically leave a commit with expt uuid
+        command = [
+            "payu",
+            "clone",
+            "-B",
+            self.base_branch_name,
+            "-b",
+            self.branch_perturb,
+            self.base_path,
+            expt_path,
+        ]
+        subprocess.run(command, check=True)
 
     def _update_mom6_params(self, expt_path, param_dict):
         """
@@ -955,9 +1036,8 @@ class Expts_manager(object):
             expt_path (str): The path to the experiment directory.
             param_dict (dict): The dictionary of parameters to update.
         """
-        MOM6_or_parser = self._parser_mom6_input(
-            os.path.join(expt_path, "MOM_override")
-        )
+        # the parsed content of `MOM_override` is fully replaced, hence no need to read it
+        MOM6_or_parser = self.MOM6InputParser.MOM6InputParser()
         MOM6_or_parser.param_dict, MOM6_or_parser.commt_dict = (
             update_MOM6_params_override(param_dict, self.commt_dict_change)
         )
@@ -981,26 +1061,28 @@ class Expts_manager(object):
             patch_dict = {nml_group: {}}
             for nml_name, nml_value in param_dict.items():
                 if nml_name == "turning_angle":
-                    cosw = np.cos(nml_value * np.pi / 180.0)
-                    sinw = np.sin(nml_value * np.pi / 180.0)
+                    cosw, sinw = self._turning_angle_to_cs(nml_value)
                     patch_dict[nml_group]["cosw"] = cosw
                     patch_dict[nml_group]["sinw"] = sinw
                 else:  # for generic parameters
                     patch_dict[nml_group][nml_name] = nml_value
             param_dict = patch_dict
-            f90nml.patch(nml_path, param_dict, nml_path + "_tmp")
-        else:
-            f90nml.patch(nml_path, param_dict, nml_path + "_tmp")
-        os.rename(nml_path + "_tmp", nml_path)
 
-        self._format_nml_params(nml_path, param_dict)
+        # patch into memory and format there, so the namelist is only written once
+        patched_nml = io.StringIO()
+        f90nml.patch(nml_path, param_dict, patched_nml)
+        patched_nml.seek(0)
+        fileread = patched_nml.readlines()
+        self._format_nml_params(fileread, param_dict)
+        with open(nml_path, "w") as f:
+            f.writelines(fileread)
 
-    def _format_nml_params(self, nml_path, param_dict):
+    def _format_nml_params(self, fileread, param_dict):
         """
         Handles pre-formatted strings or values.
 
         Args:
-            nml_path (str): The path to specific f90 namelist file.
+            fileread (list): The lines of the patched f90 namelist, updated in place.
             param_dict (dict): The dictionary of parameters to update.
             e.g., in yaml input file,
                 ocean/input.nml:
@@ -1012,16 +1094,25 @@ class Expts_manager(object):
                     fields_in = 'u_flux', 'v_flux', 'lprec'
                     fields_out = 't_surf', 's_surf', 'u_surf'
         """
-        with open(nml_path, "r") as f:
-            fileread = f.readlines()
-        for tmp_group, tmp_subgroups in param_dict.items():
-            for tmp_param, tmp_values in tmp_subgroups.items():
-                for i in range(len(fileread)):
-                    if tmp_param in fileread[i]:
-                        fileread[i] = f"    {tmp_param} = {tmp_values}\n"
-                        break
-        with open(nml_path, "w") as f:
-            f.writelines(fileread)
+        # fortran names are case-insensitive, so match on lowercase (group, param) keys
+        targets = {
+            (tmp_group.lower(), tmp_param.lower()): (tmp_param, tmp_values)
+            for tmp_group, tmp_subgroups in param_dict.items()
+            for tmp_param, tmp_values in tmp_subgroups.items()
+        }
+        current_group = None
+        for i, line in enumerate(fileread):
+            stripped = line.strip()
+            if stripped.startswith("&"):
+                group_name = stripped[1:].split()
+                current_group = group_name[0].lower() if group_name else None
+                continue
+            key = stripped.split("=", 1)[0].strip().lower()
+            target = targets.pop((current_group, key), None)
+            if target is not None:
+                fileread[i] = f"    {target[0]} = {target[1]}\n"
+                if not targets:
+                    break
 
     def _update_config_params(self, expt_path, param_dict, parameter_block):
         """
@@ -1095,18 +1186,25 @@ class Expts_manager(object):
         """
         if self.startfrom_str != "rest":
             link_restart = os.path.join("archive", "restart" + self.startfrom_str)
-            # restart dir from control experiment
-            restartpath = os.path.realpath(os.path.join(self.base_path, link_restart))
+            # restart dir from control experiment, which is the same for every perturbation experiment
+            if self.ctrl_restartpath is None:
+                self.ctrl_restartpath = os.path.realpath(
+                    os.path.join(self.base_path, link_restart)
+                )
+            restartpath = self.ctrl_restartpath
             # restart dir symlink for each perturbation experiment
             dest = os.path.join(expt_path, link_restart)
 
-            # only generate symlink if it doesnt exist or force_restart is enabled
-            if (
-                not os.path.islink(dest)
-                or self.force_restart
-                or (os.path.islink(dest) and not os.path.exists(os.readlink(dest)))
-            ):
-                if os.path.exists(dest) or os.path.islink(dest):
+            # stat `dest` itself once, without following a symlink
+            try:
+                dest_stat = os.lstat(dest)
+            except FileNotFoundError:
+                dest_stat = None
+            is_link = dest_stat is not None and stat.S_ISLNK(dest_stat.st_mode)
+
+            # only generate symlink if it doesnt exist, is broken or force_restart is enabled
+            if not is_link or self.force_restart or not os.path.exists(dest):
+                if dest_stat is not None:
                     os.remove(dest)  # remove symlink
                     print(f"-- Remove restart symlink: {dest}")
                 os.symlink(restartpath, dest)  # generate a new symlink
@@ -1176,18 +1274,28 @@ class Expts_manager(object):
         """
         Checks the existing qstat pbs information.
         """
-        current_job_status_path = os.path.join(self.dir_manager, "current_job_status")
-        command = f"qstat -f > {current_job_status_path}"
-        subprocess.run(command, shell=True, check=False)
+        try:
+            result = subprocess.run(
+                ["qstat", "-f"], capture_output=True, text=True, check=False
+            )
+        except FileNotFoundError:
+            # e.g. hosts without PBS, treat as no existing jobs as the former shell call did
+            warnings.warn(
+                "qstat is not available, hence no existing pbs jobs are checked!",
+                UserWarning,
+            )
+            return {}
+        if result.returncode != 0:
+            warnings.warn(
+                f"qstat failed with exit code {result.returncode}, existing pbs jobs may be missed: {result.stderr.strip()}",
+                UserWarning,
+            )
 
         pbs_jobs = {}
         current_key = None
-        current_value = ""
+        current_value = []  # fragments of a (multi-line) value, joined once saved
         job_id = None
-        with open(current_job_status_path, "r") as f:
-            pbs_job_file = f.read()
-
-        pbs_job_file = pbs_job_file.replace("\t", "        ")
+        pbs_job_file = result.stdout.replace("\t", "        ")
 
         for line in pbs_job_file.splitlines():
             line = line.rstrip()
@@ -1197,55 +1305,39 @@ class Expts_manager(object):
                 job_id = line.split(":", 1)[1].strip()
                 pbs_jobs[job_id] = {}
                 current_key = None
-                current_value = ""
+                current_value = []
             elif line.startswith("        ") and current_key:  # 8 indents multi-line
-                current_value += line.strip()
+                current_value.append(line.strip())
             elif line.startswith("    ") and " = " in line:  # 4 indents for new pair
                 # Save the previous multi-line value
                 if current_key:
-                    pbs_jobs[job_id][current_key] = current_value.strip()
+                    pbs_jobs[job_id][current_key] = "".join(current_value).strip()
                 key, value = line.split(" = ", 1)  # save key
                 current_key = key.strip()
-                current_value = value.strip()
-
-        # remove the `current_job_status` file
-        os.remove(current_job_status_path)
+                current_value = [value.strip()]
 
         return pbs_jobs
 
-    def _check_duplicated_jobs(self, pbs_jobs, expt_path):
-
-        def extract_current_and_parent_path(tmp_path):
-
-            # extract base_name or expt_name from pbs jobs
-            folder_path = "/" + "/".join(tmp_path.split("/")[1:-1])
-
-            # extract test_path from pbs jobs
-            parent_path = "/" + "/".join(tmp_path.split("/")[1:-2])
-
-            return folder_path, parent_path
-
-        parent_paths = {}
+    def _get_active_job_folders(self, pbs_jobs):
+        """
+        Gets the experiment folders of pbs jobs that are neither finished nor suspended.
+        """
+        active_job_folders = set()
         for job_id, job_info in pbs_jobs.items():
-            folder_path, parent_path = extract_current_and_parent_path(
-                job_info["Error_Path"]
+            if job_info["job_state"] not in ("F", "S"):
+                # extract base_name or expt_name from pbs jobs
+                folder_path = "/" + "/".join(job_info["Error_Path"].split("/")[1:-1])
+                active_job_folders.add(folder_path)
+        return active_job_folders
+
+    def _check_duplicated_jobs(self, active_job_folders, expt_path):
+        if expt_path in active_job_folders:
+            print(
+                f"-- You have duplicated runs for folder '{os.path.basename(expt_path)}' in the same folder '{os.path.dirname(expt_path)}', "
+                f"hence not submitting this job!\n"
             )
-
-            job_state = job_info["job_state"]
-            if job_state not in ("F", "S"):
-                if parent_path not in parent_paths:
-                    parent_paths[parent_path] = []
-                parent_paths[parent_path].append(folder_path)
-        duplicated = False
-
-        for parent_path, folder_paths in parent_paths.items():
-            if expt_path in folder_paths:
-                print(
-                    f"-- You have duplicated runs for folder '{os.path.basename(expt_path)}' in the same folder '{parent_path}', "
-                    f"hence not submitting this job!\n"
-                )
-                duplicated = True
-        return duplicated
+            return True
+        return False
 
     def _start_experiment_runs(self, expt_path, expt_name, duplicated, num_runs):
         """
@@ -1254,22 +1346,36 @@ class Expts_manager(object):
         Args:
             expt_path (str): The path to the control/perturbation experiment directory.
             expt_name (str): The name of the control/perturbation experiment.
+        Returns:
+            bool: True if new runs were submitted.
         """
 
         def runs():
-            doneruns = len(
-                glob.glob(os.path.join(expt_path, "archive", "output[0-9][0-9][0-9]*"))
-            )
+            # count `archive/output[0-9][0-9][0-9]*` directories
+            try:
+                entries = os.scandir(os.path.join(expt_path, "archive"))
+            except FileNotFoundError:
+                doneruns = 0
+            else:
+                with entries:
+                    doneruns = sum(
+                        1
+                        for entry in entries
+                        if entry.name.startswith("output")
+                        and entry.name[6:9].isdigit()
+                        and len(entry.name) >= 9
+                    )
             newruns = num_runs - doneruns
             if newruns > 0:
                 print(f"\nRun experiment -n {newruns}\n")
-                command = f"cd {expt_path} && payu run -n {newruns} -f"
-                subprocess.run(command, shell=True, check=False)
+                command = ["payu", "run", "-n", str(newruns), "-f"]
+                subprocess.run(command, cwd=expt_path, check=False)
                 print("\n")
-            else:
-                print(
-                    f"-- `{expt_name}` has already completed {doneruns} runs! Hence, stopping further runs.\n"
-                )
+                return True
+            print(
+                f"-- `{expt_name}` has already completed {doneruns} runs! Hence, stopping further runs.\n"
+            )
+            return False
 
         if not duplicated:
 
@@ -1277,11 +1383,11 @@ class Expts_manager(object):
             self._clean_workspace(expt_path)
 
             if num_runs > 0:
-                runs()
-            else:
-                print(
-                    f"-- number of runs is {num_runs}, hence no new experiments will start!\n"
-                )
+                return runs()
+            print(
+                f"-- number of runs is {num_runs}, hence no new experiments will start!\n"
+            )
+        return False
 
     def _clean_workspace(self, dir_path):
         """
@@ -1291,10 +1397,18 @@ class Expts_manager(object):
         # in case any failed job
         if os.path.islink(work_dir) and os.path.isdir(work_dir):
             # Payu sweep && setup to ensure the changes correctly && remove the `work` directory
-            command = f"payu sweep && payu setup"
-            subprocess.run(command, shell=True, check=False)
+            if subprocess.run(["payu", "sweep"], check=False).returncode == 0:
+                subprocess.run(["payu", "setup"], check=False)
             print(f"Clean up a failed job {work_dir} and prepare it for resubmission.")
 
+    def _turning_angle_to_cs(self, turning_angle):
+        """
+        Converts `turning_angle` in degrees to the (cosw, sinw) pair used by the namelists.
+        """
+        # keep `x * pi / 180` rather than a precomputed factor so values compare equal to existing namelists
+        angle = turning_angle * math.pi / 180.0
+        return math.cos(angle), math.sin(angle)
+
     def _check_skipping(self, param_dict, nml_group, parameter_block, expt_path):
         """
         Checks if the tuning parameter matches the control experiment,
@@ -1311,11 +1425,10 @@ class Expts_manager(object):
                 nml_value = [param_dict[j] for j in nml_name]
 
             if "turning_angle" in param_dict:
-                cosw = np.cos(param_dict["turning_angle"] * np.pi / 180.0)
-                sinw = np.sin(param_dict["turning_angle"] * np.pi / 180.0)
+                cosw, sinw = self._turning_angle_to_cs(param_dict["turning_angle"])
 
             # load nml of the control experiment
-            self.nml_ctrl = f90nml.read(os.path.join(self.base_path, parameter_block))
+            self.nml_ctrl = self._get_nml_ctrl(parameter_block)
 
             # nml_name (i.e. tunning parameter) may not be found in the control experiment
             if all(cn in self.nml_ctrl.get(nml_group, {}) for cn in nml_name):
@@ -1366,49 +1479,57 @@ class Expts_manager(object):
 
     def _update_config_entries(self, base, change):
         """
-        Recursively update nuopc_runconfig and config.yaml entries.
+        Updates nested nuopc_runconfig and config.yaml entries in place.
         """
-        for k, v in change.items():
-            if isinstance(v, dict) and k in base:
-                self._update_config_entries(base[k], v)
-            else:
-                base[k] = v
+        stack = [(base, change)]
+        while stack:
+            base, change = stack.pop()
+            for k, v in change.items():
+                if isinstance(v, dict) and k in base:
+                    stack.append((base[k], v))
+                elif not (k in base and type(base[k]) is type(v) and base[k] == v):
+                    # leave equal entries untouched to keep their round-trip quoting and comments,
+                    # but compare types too, since e.g. 1, 1.0 and True are equal in python
+                    base[k] = v
 
     def _update_cpl_dt_nuopc_seq(self, seq_path, update_cpl_dt):
         """
         Updates only coupling timestep through nuopc.runseq.
         """
-        with open(seq_path, "r") as f:
-            lines = f.readlines()
-        pattern = re.compile(r"@(\S*)")
-        update_lines = []
-        for l in lines:
-            matches = pattern.findall(l)
-            if matches:
-                update_line = re.sub(r"@(\S+)", f"@{update_cpl_dt}", l)
-                update_lines.append(update_line)
-            else:
-                update_lines.append(l)
-        with open(seq_path, "w") as f:
-            f.writelines(update_lines)
-
-    def _get_untracked_files(self, repo):
-        """
-        Gets untracked git files.
-        """
-        return repo.untracked_files
+        with open(seq_path, "r+") as f:
+            # `\S+` never spans a newline, so substitute over the whole file at once
+            update_seq = self.CPL_DT_PATTERN.sub(f"@{update_cpl_dt}", f.read())
+            f.seek(0)
+            f.write(update_seq)
+            f.truncate()
 
-    def _get_changed_files(self, repo):
+    def _get_worktree_status(self, repo):
         """
-        Gets changed git files.
+        Gets deleted, changed (excluding deleted) and untracked git files from a single `git status`.
         """
-        return [file.a_path for file in repo.index.diff(None)]
-
-    def _get_deleted_files(self, repo):
-        """
-        Gets deleted git files.
-        """
-        return [file.a_path for file in repo.index.diff(None) if file.deleted_file]
+        deleted_files = []
+        changed_files = []
+        untracked_files = []
+        entries = iter(repo.git.status("--porcelain=v1", "-uall", "-z").split("\0"))
+        for entry in entries:
+            if not entry:
+                continue
+            status, file = entry[:2], entry[3:]
+            original = None
+            if "R" in status or "C" in status:
+                # renamed or copied entries are followed by their original path
+                original = next(entries, None)
+            if status == "??":
+                untracked_files.append(file)
+            elif status[1] == "D":
+                deleted_files.append(file)
+            elif status[1] == "R":
+                # renamed in the worktree: stage the new path, remove the old one
+                changed_files.append(file)
+                deleted_files.append(original)
+            elif status[1] in "MT":
+                changed_files.append(file)
+        return deleted_files, changed_files, untracked_files
 
     def _restore_swp_files(self, repo, staged_files):
         """
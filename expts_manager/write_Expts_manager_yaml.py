@@ -456,6 +456,13 @@ if __name__ == "__main__":
             \n# Default: False.\
             \n# Set to 'True' to enforce a restart of the control and perturbation runs.\n",
         },
+        {
+            "key": "clone_workers",
+            "value": 1,
+            "comment": "\n# Maximum number of perturbation experiments cloned concurrently via `payu clone`.\
+            \n# Default: 1.\
+            \n# Values larger than 1 speed up setting up many perturbation experiments, but the output of concurrent clones is interleaved.\n",
+        },
         {
             "key": "startfrom",
             "value": "'rest'",
@@ -35,19 +35,16 @@ def get_git_url(file):
     if url.startswith("git@github.com:"):
         url = f"https://github.com/{url.removeprefix('git@github.com:')}"
 
-    top_level_dir = (
-        subprocess.check_output(["git", "-C", dirname, "rev-parse", "--show-toplevel"])
+    # resolve the top level directory and the HEAD commit with a single git call
+    top_level_dir, hash = (
+        subprocess.check_output(
+            ["git", "-C", dirname, "rev-parse", "--show-toplevel", "HEAD"]
+        )
         .decode("ascii")
-        .strip()
+        .splitlines()
     )
     rel_path = file.removeprefix(top_level_dir)
 
-    hash = (
-        subprocess.check_output(["git", "-C", dirname, "rev-parse", "HEAD"])
-        .decode("ascii")
-        .strip()
-    )
-
     return f"{url}/blob/{hash}{rel_path}"
 
 